@@ -233,3 +233,764 @@ gym = albert.subject('Gym')
 gym.report_grade(100, 0.40)
 gym.report_grade(85, 0.60)
 print(albert.average_grade())
+
+
+# Example 14
+''' Every Grade namedtuple costs a tuple plus two boxed numbers. Keep the
+scores and weights in two parallel array('d') buffers instead, which store
+16 bytes per grade and grow with amortised appends. The API stays the same '''
+print('\nExample 14:\n==========')
+
+from array import array
+
+class ArraySubject(object):
+    def __init__(self):
+        self._scores = array('d')
+        self._weights = array('d')
+
+    def report_grade(self, score, weight):
+        self._scores.append(score)
+        self._weights.append(weight)
+
+    def average_grade(self):
+        total = sum(s * w for s, w in zip(self._scores, self._weights))
+        return total / sum(self._weights)
+
+
+class ArrayStudent(Student):
+    def subject(self, name):
+        if name not in self._subjects:
+            self._subjects[name] = ArraySubject()
+        return self._subjects[name]
+
+
+class ArrayGradebook(Gradebook):
+    def student(self, name):
+        if name not in self._students:
+            self._students[name] = ArrayStudent()
+        return self._students[name]
+
+
+# Example 15
+''' The gradebook gives the same answer as Example 13, the averages match,
+and the storage shrinks by about an order of magnitude '''
+print('\nExample 15:\n==========')
+
+import random
+import sys
+
+book = ArrayGradebook()
+albert = book.student('Albert Einstein')
+math = albert.subject('Math')
+math.report_grade(80, 0.10)
+math.report_grade(80, 0.10)
+math.report_grade(70, 0.80)
+gym = albert.subject('Gym')
+gym.report_grade(100, 0.40)
+gym.report_grade(85, 0.60)
+print(albert.average_grade())
+
+def grade_bytes(subject):
+    if isinstance(subject, ArraySubject):
+        return sys.getsizeof(subject._scores) + sys.getsizeof(subject._weights)
+    size = sys.getsizeof(subject._grades)
+    for grade in subject._grades:
+        size += sys.getsizeof(grade)
+        size += sys.getsizeof(grade.score) + sys.getsizeof(grade.weight)
+    return size
+
+subject, compact = Subject(), ArraySubject()
+for _ in range(100000):
+    score, weight = random.uniform(50, 100), random.uniform(0.1, 1)
+    subject.report_grade(score, weight)
+    compact.report_grade(score, weight)
+print(round(subject.average_grade(), 6), round(compact.average_grade(), 6))
+print(grade_bytes(subject) // 100000, 'bytes per grade vs',
+      grade_bytes(compact) // 100000)
+
+
+# Example 16
+''' average_grade walks every grade on each call. Keep running sums that
+report_grade updates instead, so averages come back in constant time. Neumaier
+compensated summation keeps the sums accurate over millions of updates '''
+print('\nExample 16:\n==========')
+
+class CompensatedSum(object):
+    def __init__(self):
+        self._total = 0.0
+        self._compensation = 0.0
+
+    def add(self, value):
+        total = self._total + value
+        if abs(self._total) >= abs(value):
+            self._compensation += (self._total - total) + value
+        else:
+            self._compensation += (value - total) + self._total
+        self._total = total
+
+    @property
+    def value(self):
+        return self._total + self._compensation
+
+
+class RunningSubject(object):
+    def __init__(self, on_change=None):
+        self._weighted = CompensatedSum()
+        self._weight = CompensatedSum()
+        self._count = 0
+        self._on_change = on_change
+
+    def _average_or_none(self):
+        # There is no average until the grades carry some weight
+        if not self._weight.value:
+            return None
+        return self.average_grade()
+
+    def report_grade(self, score, weight):
+        old = self._average_or_none()
+        self._weighted.add(score * weight)
+        self._weight.add(weight)
+        self._count += 1
+        new = self._average_or_none()
+        if self._on_change is not None and new is not None:
+            self._on_change(old, new)
+
+    def average_grade(self):
+        return self._weighted.value / self._weight.value
+
+
+# Example 17
+''' A student keeps the sum of its subject averages. Each subject reports its
+old and new average, so the student only adjusts the sum by the difference.
+A subject counts once its grades carry some weight '''
+print('\nExample 17:\n==========')
+
+class RunningStudent(object):
+    def __init__(self, on_change=None):
+        self._subjects = {}
+        self._averages = CompensatedSum()
+        self._graded = 0
+        self._on_change = on_change
+
+    def subject(self, name):
+        if name not in self._subjects:
+            self._subjects[name] = RunningSubject(self._subject_changed)
+        return self._subjects[name]
+
+    def _subject_changed(self, old, new):
+        before = self.average_grade() if self._graded else None
+        if old is None:
+            self._graded += 1
+        else:
+            self._averages.add(-old)
+        self._averages.add(new)
+        if self._on_change is not None:
+            self._on_change(before, self.average_grade())
+
+    def average_grade(self):
+        return self._averages.value / self._graded
+
+
+class RunningGradebook(Gradebook):
+    def student(self, name):
+        if name not in self._students:
+            self._students[name] = RunningStudent()
+        return self._students[name]
+
+
+# Example 18
+''' The running averages agree with walking every grade '''
+print('\nExample 18:\n==========')
+
+book, running_book = Gradebook(), RunningGradebook()
+for _ in range(10000):
+    subject = random.choice(['Math', 'Gym', 'Physics'])
+    score, weight = random.uniform(50, 100), random.uniform(0.1, 1)
+    book.student('Albert Einstein').subject(subject).report_grade(
+        score, weight)
+    running_book.student('Albert Einstein').subject(subject).report_grade(
+        score, weight)
+print(round(book.student('Albert Einstein').average_grade(), 9))
+print(round(running_book.student('Albert Einstein').average_grade(), 9))
+
+
+# Example 19
+''' Cohort-wide averages mean millions of interpreted average_grade calls.
+Store every grade as one row across columnar arrays of student ids, subject
+ids, scores and weights instead. Batch queries then make one vectorized pass
+over the columns with NumPy when it is installed, or one loop over the arrays
+when it is not. The student and subject handles keep the report_grade API '''
+print('\nExample 19:\n==========')
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class ColumnarSubject(object):
+    def __init__(self, book, student_id, subject_id):
+        self._book = book
+        self._student_id = student_id
+        self._subject_id = subject_id
+
+    def report_grade(self, score, weight):
+        self._book._append(self._student_id, self._subject_id, score, weight)
+
+
+class ColumnarStudent(object):
+    def __init__(self, book, student_id):
+        self._book = book
+        self._student_id = student_id
+
+    def subject(self, name):
+        subject_id = self._book._intern(self._book._subject_ids,
+                                        self._book._subject_names, name)
+        return ColumnarSubject(self._book, self._student_id, subject_id)
+
+
+class ColumnarGradebook(object):
+    def __init__(self):
+        self._student_ids, self._student_names = {}, []
+        self._subject_ids, self._subject_names = {}, []
+        self._students = array('q')
+        self._subjects = array('q')
+        self._scores = array('d')
+        self._weights = array('d')
+
+    @staticmethod
+    def _intern(ids, names, name):
+        if name not in ids:
+            ids[name] = len(names)
+            names.append(name)
+        return ids[name]
+
+    def _append(self, student_id, subject_id, score, weight):
+        self._students.append(student_id)
+        self._subjects.append(subject_id)
+        self._scores.append(score)
+        self._weights.append(weight)
+
+    def student(self, name):
+        student_id = self._intern(self._student_ids, self._student_names,
+                                  name)
+        return ColumnarStudent(self, student_id)
+
+    def cohort_average(self):
+        # Subjects and students without any weight have no average
+        if numpy is not None:
+            weights = numpy.asarray(self._weights)
+            total_weight = float(weights.sum())
+            if not total_weight:
+                return None
+            return float(numpy.dot(self._scores, weights)) / total_weight
+        total_weight = sum(self._weights)
+        if not total_weight:
+            return None
+        total = sum(s * w for s, w in zip(self._scores, self._weights))
+        return total / total_weight
+
+    def subject_averages(self):
+        count = len(self._subject_names)
+        if numpy is not None:
+            subjects = numpy.asarray(self._subjects)
+            weights = numpy.asarray(self._weights)
+            weighted = numpy.asarray(self._scores) * weights
+            totals = numpy.bincount(subjects, weighted, count)
+            total_weights = numpy.bincount(subjects, weights, count)
+            graded = numpy.flatnonzero(total_weights)
+            averages = totals[graded] / total_weights[graded]
+            return {self._subject_names[i]: average
+                    for i, average in zip(graded.tolist(), averages.tolist())}
+        totals, total_weights = [0.0] * count, [0.0] * count
+        for subject, score, weight in zip(self._subjects, self._scores,
+                                          self._weights):
+            totals[subject] += score * weight
+            total_weights[subject] += weight
+        return {name: totals[i] / total_weights[i]
+                for i, name in enumerate(self._subject_names)
+                if total_weights[i]}
+
+    def student_averages(self):
+        ''' The mean of each student's per-subject weighted averages, matching
+        Student.average_grade '''
+        count = len(self._student_names)
+        if numpy is not None:
+            pairs = (numpy.asarray(self._students) * len(self._subject_names)
+                     + numpy.asarray(self._subjects))
+            keys, index = numpy.unique(pairs, return_inverse=True)
+            weights = numpy.asarray(self._weights)
+            weighted = numpy.asarray(self._scores) * weights
+            pair_weights = numpy.bincount(index, weights, len(keys))
+            weighted_pairs = numpy.flatnonzero(pair_weights)
+            subject_averages = (
+                numpy.bincount(index, weighted, len(keys))[weighted_pairs] /
+                pair_weights[weighted_pairs])
+            students = keys[weighted_pairs] // len(self._subject_names)
+            totals = numpy.bincount(students, subject_averages, count)
+            subject_counts = numpy.bincount(students, minlength=count)
+            graded = numpy.flatnonzero(subject_counts)
+            averages = totals[graded] / subject_counts[graded]
+            return {self._student_names[i]: average
+                    for i, average in zip(graded.tolist(), averages.tolist())}
+        pairs = {}
+        for student, subject, score, weight in zip(
+                self._students, self._subjects, self._scores, self._weights):
+            pair = pairs.get((student, subject))
+            if pair is None:
+                pair = pairs[student, subject] = [0.0, 0.0]
+            pair[0] += score * weight
+            pair[1] += weight
+        totals, subject_counts = [0.0] * count, [0] * count
+        for (student, _), (total, total_weight) in pairs.items():
+            if total_weight:
+                totals[student] += total / total_weight
+                subject_counts[student] += 1
+        return {name: totals[i] / subject_counts[i]
+                for i, name in enumerate(self._student_names)
+                if subject_counts[i]}
+
+
+# Example 20
+''' One call answers for the whole roster and agrees with the per-student
+classes '''
+print('\nExample 20:\n==========')
+
+book, columnar = Gradebook(), ColumnarGradebook()
+for _ in range(10000):
+    name = 'Student %d' % random.randint(0, 99)
+    subject = random.choice(['Math', 'Gym', 'Physics'])
+    score, weight = random.uniform(50, 100), random.uniform(0.1, 1)
+    book.student(name).subject(subject).report_grade(score, weight)
+    columnar.student(name).subject(subject).report_grade(score, weight)
+averages = columnar.student_averages()
+print(round(averages['Student 0'], 9),
+      round(book.student('Student 0').average_grade(), 9))
+print({name: round(avg, 3)
+       for name, avg in sorted(columnar.subject_averages().items())})
+print(round(columnar.cohort_average(), 3))
+
+
+# Example 21
+''' Loading tens of millions of grades one report_grade call at a time is far
+too slow. Stream grade records from CSV or JSON-lines files instead. Each
+name is resolved to its id with a single dict lookup, rows are collected into
+local arrays, and the arrays are appended to the columns in batches. The load
+reports its throughput '''
+print('\nExample 21:\n==========')
+
+import csv
+import json
+import os
+import time
+
+LoadStats = collections.namedtuple(
+    'LoadStats', ('records', 'seconds', 'records_per_second'))
+
+def read_grade_records(f, file_format):
+    if file_format == 'csv':
+        for row in csv.DictReader(f):
+            yield row['student'], row['subject'], row['score'], row['weight']
+    elif file_format == 'jsonl':
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                yield (row['student'], row['subject'], row['score'],
+                       row['weight'])
+    else:
+        raise ValueError('Unknown grade format %r' % file_format)
+
+
+class BulkGradebook(ColumnarGradebook):
+    def _extend(self, students, subjects, scores, weights):
+        self._students.extend(students)
+        self._subjects.extend(subjects)
+        self._scores.extend(scores)
+        self._weights.extend(weights)
+
+    def load(self, path, file_format=None, batch_size=100000):
+        if file_format is None:
+            file_format = os.path.splitext(path)[1].lstrip('.')
+        start = time.perf_counter()
+        student_ids, subject_ids = self._student_ids, self._subject_ids
+        students, subjects = array('q'), array('q')
+        scores, weights = array('d'), array('d')
+        records = 0
+        with open(path, newline='') as f:
+            for student, subject, score, weight in read_grade_records(
+                    f, file_format):
+                student_id = student_ids.get(student)
+                if student_id is None:
+                    student_id = self._intern(
+                        student_ids, self._student_names, student)
+                subject_id = subject_ids.get(subject)
+                if subject_id is None:
+                    subject_id = self._intern(
+                        subject_ids, self._subject_names, subject)
+                students.append(student_id)
+                subjects.append(subject_id)
+                scores.append(float(score))
+                weights.append(float(weight))
+                records += 1
+                if len(students) >= batch_size:
+                    self._extend(students, subjects, scores, weights)
+                    del students[:], subjects[:], scores[:], weights[:]
+        self._extend(students, subjects, scores, weights)
+        seconds = time.perf_counter() - start
+        rate = records / seconds if seconds else float('inf')
+        return LoadStats(records, seconds, rate)
+
+
+# Example 22
+''' Loading the same grades from CSV and JSON lines gives the same averages '''
+print('\nExample 22:\n==========')
+
+from tempfile import TemporaryDirectory
+
+with TemporaryDirectory() as tmpdir:
+    csv_path = os.path.join(tmpdir, 'grades.csv')
+    jsonl_path = os.path.join(tmpdir, 'grades.jsonl')
+    with open(csv_path, 'w', newline='') as csv_file, \
+            open(jsonl_path, 'w') as jsonl_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(['student', 'subject', 'score', 'weight'])
+        for _ in range(10000):
+            row = ['Student %d' % random.randint(0, 99),
+                   random.choice(['Math', 'Gym', 'Physics']),
+                   random.randint(50, 100), random.choice([0.1, 0.5, 1.0])]
+            writer.writerow(row)
+            jsonl_file.write(json.dumps(dict(zip(
+                ['student', 'subject', 'score', 'weight'], row))) + '\n')
+    from_csv, from_jsonl = BulkGradebook(), BulkGradebook()
+    stats = from_csv.load(csv_path, batch_size=1000)
+    from_jsonl.load(jsonl_path)
+print(stats.records, 'records loaded')
+print(from_csv.student_averages() == from_jsonl.student_averages())
+
+
+# Example 23
+''' Gradebook and Student key everything by full name strings, so each lookup
+hashes a string and every student stores its own copies of the subject names.
+Intern names to dense integer ids once. Students live in a list indexed by
+id, each student keys its subjects by the shared subject id, and the
+name-based methods become a thin layer over the id-based ones '''
+print('\nExample 23:\n==========')
+
+class NameInterner(object):
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+
+    def id(self, name):
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = len(self._names)
+            name = sys.intern(name)
+            self._ids[name] = name_id
+            self._names.append(name)
+        return name_id
+
+    def name(self, name_id):
+        return self._names[name_id]
+
+    def __len__(self):
+        return len(self._names)
+
+
+class InternedStudent(object):
+    def __init__(self, subject_names):
+        self._subject_names = subject_names
+        self._subjects = {}
+
+    def subject_by_id(self, subject_id):
+        subject = self._subjects.get(subject_id)
+        if subject is None:
+            subject = self._subjects[subject_id] = ArraySubject()
+        return subject
+
+    def subject(self, name):
+        return self.subject_by_id(self._subject_names.id(name))
+
+    def average_grade(self):
+        total = sum(s.average_grade() for s in self._subjects.values())
+        return total / len(self._subjects)
+
+
+class InternedGradebook(object):
+    def __init__(self):
+        self.student_names = NameInterner()
+        self.subject_names = NameInterner()
+        self._students = []
+
+    def student_by_id(self, student_id):
+        if not 0 <= student_id < len(self.student_names):
+            raise IndexError('Unknown student id %r' % student_id)
+        # Names may be interned directly, so fill in any students skipped
+        while len(self._students) <= student_id:
+            self._students.append(InternedStudent(self.subject_names))
+        return self._students[student_id]
+
+    def student(self, name):
+        return self.student_by_id(self.student_names.id(name))
+
+
+# Example 24
+''' Callers that already hold ids skip string hashing entirely, while the
+name-based calls work as before '''
+print('\nExample 24:\n==========')
+
+book = InternedGradebook()
+albert = book.student('Albert Einstein')
+albert.subject('Math').report_grade(80, 0.10)
+albert.subject('Math').report_grade(70, 0.80)
+albert.subject('Gym').report_grade(100, 0.40)
+student_id = book.student_names.id('Albert Einstein')
+math_id = book.subject_names.id('Math')
+book.student_by_id(student_id).subject_by_id(math_id).report_grade(80, 0.10)
+print(student_id, math_id, book.subject_names.name(1))
+print(book.student('Albert Einstein').average_grade())
+
+
+# Example 25
+''' When many threads call report_grade on one Gradebook, the check-then-create
+in student() and subject() races and can silently replace a Subject. Shard the
+students across several locks by name so that creating students only contends
+within a shard, and give each student one lock that guards its subjects and
+running sums. Writes to different students never share a lock. Lookups of
+existing entries take no lock at all '''
+print('\nExample 25:\n==========')
+
+from threading import Lock, RLock, Thread
+
+class LockedSubject(RunningSubject):
+    def __init__(self, lock, on_change=None):
+        super().__init__(on_change)
+        self._lock = lock
+
+    def report_grade(self, score, weight):
+        with self._lock:
+            super().report_grade(score, weight)
+
+    def average_grade(self):
+        with self._lock:
+            return super().average_grade()
+
+
+class ConcurrentStudent(RunningStudent):
+    def __init__(self, on_change=None):
+        super().__init__(on_change)
+        self._lock = RLock()  # Held again by _subject_changed
+
+    def subject(self, name):
+        subject = self._subjects.get(name)
+        if subject is None:
+            with self._lock:
+                subject = self._subjects.get(name)
+                if subject is None:
+                    subject = LockedSubject(self._lock, self._subject_changed)
+                    self._subjects[name] = subject
+        return subject
+
+    def average_grade(self):
+        with self._lock:
+            return super().average_grade()
+
+
+class ConcurrentGradebook(object):
+    def __init__(self, shards=16):
+        self._shards = [(Lock(), {}) for _ in range(shards)]
+
+    def _new_student(self, name):
+        return ConcurrentStudent()
+
+    def student(self, name):
+        lock, students = self._shards[hash(name) % len(self._shards)]
+        student = students.get(name)
+        if student is None:
+            with lock:
+                student = students.get(name)
+                if student is None:
+                    student = students[name] = self._new_student(name)
+        return student
+
+
+# Example 26
+''' Many threads writing to the same students lose no grades '''
+print('\nExample 26:\n==========')
+
+book = ConcurrentGradebook()
+names = ['Student %d' % i for i in range(20)]
+
+def report_many():
+    for i in range(2000):
+        student = book.student(names[i % len(names)])
+        student.subject(random.choice(['Math', 'Gym'])).report_grade(90, 1.0)
+
+threads = [Thread(target=report_many) for _ in range(8)]
+for thread in threads: thread.start()
+for thread in threads: thread.join()
+grades = sum(subject._count
+             for name in names
+             for subject in book.student(name)._subjects.values())
+print(grades, 'grades,', book.student(names[0]).average_grade(), 'average')
+
+
+# Example 27
+''' Finding the top students or one student's rank means averaging everyone
+and sorting. Keep an ordered index that is updated whenever an average
+changes instead. An indexable skip list stores how many entries each link
+skips over, so insert, remove, rank and lookup by position all take
+O(log n) expected time '''
+print('\nExample 27:\n==========')
+
+class SkipNode(object):
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, levels):
+        self.value = value
+        self.next = [None] * levels
+        self.width = [1] * levels
+
+
+class IndexableSkipList(object):
+    max_levels = 32
+
+    def __init__(self):
+        self._head = SkipNode(None, self.max_levels)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _find(self, value):
+        # Last node before value on each level, and its position
+        update = [None] * self.max_levels
+        positions = [0] * self.max_levels
+        node, position = self._head, 0
+        for level in reversed(range(self.max_levels)):
+            while (node.next[level] is not None and
+                   node.next[level].value < value):
+                position += node.width[level]
+                node = node.next[level]
+            update[level] = node
+            positions[level] = position
+        return update, positions
+
+    def insert(self, value):
+        levels = 1
+        while levels < self.max_levels and random.random() < 0.5:
+            levels += 1
+        update, positions = self._find(value)
+        new_position = positions[0] + 1
+        new = SkipNode(value, levels)
+        for level in range(self.max_levels):
+            prev = update[level]
+            if level < levels:
+                if prev.next[level] is not None:
+                    new.next[level] = prev.next[level]
+                    new.width[level] = (positions[level] + prev.width[level]
+                                        + 1 - new_position)
+                prev.next[level] = new
+                prev.width[level] = new_position - positions[level]
+            elif prev.next[level] is not None:
+                prev.width[level] += 1
+        self._size += 1
+
+    def remove(self, value):
+        update, _ = self._find(value)
+        target = update[0].next[0]
+        if target is None or target.value != value:
+            raise ValueError('%r not in list' % (value,))
+        for level in range(self.max_levels):
+            prev = update[level]
+            if level < len(target.next) and prev.next[level] is target:
+                prev.next[level] = target.next[level]
+                if target.next[level] is not None:
+                    prev.width[level] += target.width[level] - 1
+            elif prev.next[level] is not None:
+                prev.width[level] -= 1
+        self._size -= 1
+
+    def index(self, value):
+        update, positions = self._find(value)
+        target = update[0].next[0]
+        if target is None or target.value != value:
+            raise ValueError('%r not in list' % (value,))
+        return positions[0]
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._size:
+            raise IndexError('skip list index out of range')
+        node, position = self._head, 0
+        for level in reversed(range(self.max_levels)):
+            while (node.next[level] is not None and
+                   position + node.width[level] <= index + 1):
+                position += node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def first(self, count):
+        node = self._head.next[0]
+        while node is not None and count > 0:
+            yield node.value
+            node = node.next[0]
+            count -= 1
+
+
+# Example 28
+''' The leaderboard orders students by descending average, breaking ties by
+name. The ranked gradebook hooks each student's on_change callback, so every
+report_grade moves that one student in the index '''
+print('\nExample 28:\n==========')
+
+class Leaderboard(object):
+    def __init__(self):
+        self._index = IndexableSkipList()
+        self._averages = {}
+        self._lock = Lock()
+
+    def update(self, name, average):
+        with self._lock:
+            old = self._averages.get(name)
+            if old is not None:
+                self._index.remove((-old, name))
+            self._index.insert((-average, name))
+            self._averages[name] = average
+
+    def top(self, count):
+        with self._lock:
+            return [(name, -negative)
+                    for negative, name in self._index.first(count)]
+
+    def rank(self, name):
+        with self._lock:
+            key = (-self._averages[name], name)
+            return self._index.index(key) + 1
+
+
+class RankedGradebook(ConcurrentGradebook):
+    def __init__(self, shards=16):
+        super().__init__(shards)
+        self.leaderboard = Leaderboard()
+
+    def _new_student(self, name):
+        def on_change(old, new):
+            self.leaderboard.update(name, new)
+        return ConcurrentStudent(on_change)
+
+
+# Example 29
+''' Top-k and rank queries agree with averaging and sorting everyone '''
+print('\nExample 29:\n==========')
+
+book = RankedGradebook()
+names = ['Student %d' % i for i in range(200)]
+for _ in range(5000):
+    student = book.student(random.choice(names))
+    subject = random.choice(['Math', 'Gym', 'Physics'])
+    student.subject(subject).report_grade(random.randint(50, 100),
+                                          random.choice([0.1, 0.5, 1.0]))
+graded = [n for n in names if book.student(n)._graded]
+ordered = sorted(graded, key=lambda n: (-book.student(n).average_grade(), n))
+print(book.leaderboard.top(3))
+print([name for name, _ in book.leaderboard.top(len(graded))] == ordered)
+print(book.leaderboard.rank(ordered[41]))
@@ -205,3 +205,1587 @@ with TemporaryDirectory() as tmpdir:
 	config = {'data_dir': tmpdir}
 	result = mapreduce(LineCountWorker, PathInputData, config)
 print('There are', result, 'lines')
+
+
+# Example 16
+''' map() is CPU bound for LineCountWorker, so threads never use more than one
+core. Accept any concurrent.futures executor for the map step. Workers are sent
+to the executor and returned with their result set, which keeps the
+GenericWorker and GenericInputData contracts unchanged. The process examples
+in this file only run when it is executed as a script, and they use the fork
+start method so child processes don't re-run every example, which makes them
+POSIX-only '''
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+def run_map(worker):
+    worker.map()
+    return worker
+
+def execute(workers, executor=None):
+    if executor is None:
+        threads = [Thread(target=w.map) for w in workers]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+    else:
+        workers = list(executor.map(run_map, workers))
+
+    first, rest = workers[0], workers[1:]
+    for worker in rest:
+        first.reduce(worker)
+    return first.result
+
+def mapreduce(worker_class, input_class, config, executor=None):
+    workers = worker_class.create_workers(input_class, config)
+    return execute(workers, executor=executor)
+
+
+# Example 17
+''' Running the map step in a pool of processes gives the same answer but
+spreads the work across every core '''
+print('\nExample 17:\n==========')
+
+if __name__ == '__main__':
+    with TemporaryDirectory() as tmpdir:
+        write_test_files(tmpdir)
+        config = {'data_dir': tmpdir}
+        with ProcessPoolExecutor(mp_context=get_context('fork')) as executor:
+            result = mapreduce(LineCountWorker, PathInputData, config,
+                               executor=executor)
+    print('There are', result, 'lines')
+
+
+# Example 18
+''' Starting a thread for every input falls over once there are hundreds of
+thousands of files. Feed the workers through a queue to a fixed number of
+threads instead. At most max_workers inputs are open at any moment, and the
+workers can come from a generator so they are created as the threads catch up.
+Each finished worker is folded into the running total and dropped, and the
+first error from map() or reduce() is raised in the caller '''
+
+from queue import Queue
+from threading import Lock
+
+def execute_bounded(workers, max_workers=8):
+    work_queue = Queue(maxsize=max_workers * 2)
+    lock = Lock()
+    total = None
+    errors = []
+
+    def consume():
+        nonlocal total
+        while True:
+            worker = work_queue.get()
+            if worker is None:
+                break
+            if errors:
+                continue  # Keep draining so the producer never blocks
+            try:
+                worker.map()
+                with lock:
+                    if total is None:
+                        total = worker
+                    else:
+                        total.reduce(worker)
+            except Exception as e:
+                errors.append(e)
+
+    threads = [Thread(target=consume) for _ in range(max_workers)]
+    for thread in threads: thread.start()
+    try:
+        for worker in workers:
+            if errors:
+                break
+            work_queue.put(worker)
+    finally:
+        for _ in threads:
+            work_queue.put(None)
+        for thread in threads: thread.join()
+
+    if errors:
+        raise errors[0]
+    if total is None:
+        raise ValueError('No inputs to map')
+    return total.result
+
+
+# Example 19
+''' The concurrency limit comes from the config so that the caller can size it
+for the host '''
+print('\nExample 19:\n==========')
+
+def mapreduce_bounded(worker_class, input_class, config):
+    workers = (worker_class(input_data)
+               for input_data in input_class.generate_inputs(config))
+    return execute_bounded(workers, config.get('max_workers', 8))
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir, 'max_workers': 4}
+    result = mapreduce_bounded(LineCountWorker, PathInputData, config)
+print('There are', result, 'lines')
+
+
+# Example 20
+''' read() decodes the whole file into one str and never closes the file.
+Close the file with a with statement, and add a streaming mode that yields
+fixed-size binary chunks or exposes the file as an mmap, so workers can scan
+multi-GB inputs without building one big string '''
+
+import mmap
+from contextlib import contextmanager
+
+class PathInputData(GenericInputData):
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def read(self):
+        with open(self.path) as f:
+            return f.read()
+
+    def read_chunks(self, chunk_size=1024 * 1024):
+        with open(self.path, 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+
+    @contextmanager
+    def mmap(self):
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                yield b''  # Empty files can't be mapped
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                yield m
+
+    @classmethod
+    def generate_inputs(cls, config):
+        data_dir = config['data_dir']
+        for name in os.listdir(data_dir):
+            yield cls(os.path.join(data_dir, name))
+
+
+# Example 21
+''' A worker that only counts newlines can consume the chunks directly, keeping
+peak memory at one chunk per worker '''
+print('\nExample 21:\n==========')
+
+class StreamingLineCountWorker(GenericWorker):
+    def map(self):
+        self.result = sum(chunk.count(b'\n')
+                          for chunk in self.input_data.read_chunks())
+
+    def reduce(self, other):
+        self.result += other.result
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir}
+    expected = mapreduce(LineCountWorker, PathInputData, config)
+    result = mapreduce(StreamingLineCountWorker, PathInputData, config)
+    with PathInputData(os.path.join(tmpdir, '0')).mmap() as m:
+        first = m[:].count(b'\n')
+print('There are', result, 'lines, expected', expected)
+print('The first file has', first, 'lines')
+
+
+# Example 22
+''' The reduce step waits for the slowest mapper and then runs serially. Fold
+results together in pairs as soon as mappers finish instead. Each combine is
+itself a task in the executor, so expensive reduce() implementations run in
+parallel and the reduction forms a tree '''
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+def reduce_pair(first, second):
+    first.reduce(second)
+    return first
+
+def execute_tree(workers, executor):
+    pending = {executor.submit(run_map, w) for w in workers}
+    spare = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            worker = future.result()
+            if spare is None:
+                spare = worker
+            else:
+                pending.add(executor.submit(reduce_pair, spare, worker))
+                spare = None
+    if spare is None:
+        raise ValueError('No inputs to map')
+    return spare.result
+
+
+# Example 23
+''' The tree reduction works with thread and process pools alike '''
+print('\nExample 23:\n==========')
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir}
+    workers = LineCountWorker.create_workers(PathInputData, config)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        result = execute_tree(workers, executor)
+print('There are', result, 'lines')
+
+
+# Example 24
+''' Listing directories with os.listdir builds the whole listing, includes
+subdirectories and throws away the stat information the planners need.
+os.scandir streams directory entries and already knows their type, so the scan
+can recurse lazily, skip anything that isn't a regular file, filter by glob and
+keep the size and mtime. The config decides how a data directory is scanned '''
+
+import collections
+import fnmatch
+
+ScanEntry = collections.namedtuple('ScanEntry', ('path', 'size', 'mtime'))
+
+def scan_files(data_dir, recursive=False, include=None, exclude=None,
+               _prefix=''):
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            relative = _prefix + entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from scan_files(entry.path, recursive, include,
+                                          exclude, relative + os.sep)
+                continue
+            if not entry.is_file(follow_symlinks=False):
+                continue
+            if include and not any(fnmatch.fnmatch(relative, pattern)
+                                   for pattern in include):
+                continue
+            if exclude and any(fnmatch.fnmatch(relative, pattern)
+                               for pattern in exclude):
+                continue
+            stat = entry.stat(follow_symlinks=False)
+            yield ScanEntry(entry.path, stat.st_size, stat.st_mtime)
+
+def scan_inputs(config):
+    return scan_files(config['data_dir'],
+                      recursive=config.get('recursive', False),
+                      include=config.get('include'),
+                      exclude=config.get('exclude'))
+
+
+# Example 25
+''' One huge file becomes one map task and sets the wall-clock time for the
+whole job. Plan byte-range splits of a target size instead. A split owns every
+line that starts inside its range, so both ends are moved forward to the next
+line boundary and no line is counted twice or missed '''
+
+class PathSplitInputData(GenericInputData):
+    def __init__(self, path, start, end):
+        super().__init__()
+        self.path = path
+        self.start = start
+        self.end = end
+
+    @staticmethod
+    def _align(f, offset, size):
+        if offset == 0 or offset >= size:
+            return min(offset, size)
+        f.seek(offset - 1)
+        f.readline()
+        return f.tell()
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            start = self._align(f, self.start, size)
+            end = self._align(f, self.end, size)
+            if end <= start:
+                return ''
+            f.seek(start)
+            return f.read(end - start).decode()
+
+    @classmethod
+    def generate_inputs(cls, config):
+        split_size = config.get('split_size', 64 * 1024 * 1024)
+        for entry in scan_inputs(config):
+            for start in range(0, entry.size, split_size):
+                yield cls(entry.path, start,
+                          min(start + split_size, entry.size))
+
+
+# Example 26
+''' Splitting the same files into tiny ranges gives exactly the same total '''
+print('\nExample 26:\n==========')
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    with open(os.path.join(tmpdir, 'big'), 'w') as f:
+        for i in range(1000):
+            f.write('line %d\n' % i)
+    expected = mapreduce(LineCountWorker, PathInputData, {'data_dir': tmpdir})
+    config = {'data_dir': tmpdir, 'split_size': 7}
+    result = mapreduce(LineCountWorker, PathSplitInputData, config)
+print('There are', result, 'lines, expected', expected)
+
+
+# Example 27
+''' With many tiny files the per-task overhead dominates. Bin-pack the files by
+size into a few map tasks with roughly equal bytes each. Files are placed
+largest first into whichever task currently holds the fewest bytes. read()
+returns the files' contents unchanged so totals match the unpacked job, and
+read_parts() yields each file's text separately for workers that need the
+boundaries between files '''
+
+import heapq
+import math
+
+class PackedPathInputData(GenericInputData):
+    def __init__(self, paths):
+        super().__init__()
+        self.paths = paths
+
+    def read_parts(self):
+        for path in self.paths:
+            with open(path) as f:
+                yield f.read()
+
+    def read(self):
+        return ''.join(self.read_parts())
+
+    @classmethod
+    def generate_inputs(cls, config):
+        target = config.get('task_bytes', 64 * 1024 * 1024)
+        sizes = [(entry.size, entry.path) for entry in scan_inputs(config)]
+        if not sizes:
+            return
+        total = sum(size for size, _ in sizes)
+        task_count = min(len(sizes), max(1, math.ceil(total / target)))
+
+        bins = [(0, i, []) for i in range(task_count)]
+        for size, path in sorted(sizes, reverse=True):
+            used, i, paths = heapq.heappop(bins)
+            paths.append(path)
+            heapq.heappush(bins, (used + size, i, paths))
+        for _, _, paths in bins:
+            yield cls(paths)
+
+
+# Example 28
+''' The 100 test files become a handful of balanced tasks with the same total
+'''
+print('\nExample 28:\n==========')
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir, 'task_bytes': 1000}
+    tasks = list(PackedPathInputData.generate_inputs(config))
+    task_bytes = [sum(os.path.getsize(p) for p in t.paths) for t in tasks]
+    result = mapreduce(LineCountWorker, PackedPathInputData, config)
+    expected = mapreduce(LineCountWorker, PathInputData, config)
+print(len(tasks), 'tasks holding', task_bytes, 'bytes')
+print('There are', result, 'lines, expected', expected)
+
+
+# Example 29
+''' Adding results together only works for scalar totals. For word counts and
+group-bys, mappers emit (key, value) pairs instead. A map-side combiner folds
+values for the same key before anything leaves the mapper, and the pairs are
+hash partitioned so each partition can be reduced on its own '''
+
+import zlib
+
+class KeyedWorker(GenericWorker):
+    partitions = 4
+
+    def map_pairs(self):
+        raise NotImplementedError
+
+    def combine(self, value, other):
+        return value + other
+
+    def partition(self, key):
+        # hash() of a str is seeded per process, so use a stable checksum
+        return zlib.crc32(repr(key).encode()) % self.partitions
+
+    def map(self):
+        self.result = [{} for _ in range(self.partitions)]
+        for key, value in self.map_pairs():
+            part = self.result[self.partition(key)]
+            if key in part:
+                part[key] = self.combine(part[key], value)
+            else:
+                part[key] = value
+
+    def reduce_partition(self, index, other):
+        part = self.result[index]
+        for key, value in other.result[index].items():
+            if key in part:
+                part[key] = self.combine(part[key], value)
+            else:
+                part[key] = value
+        other.result[index] = None  # Release the shuffled data
+
+    def reduce(self, other):
+        for index in range(self.partitions):
+            self.reduce_partition(index, other)
+
+
+# Example 30
+''' The shuffle gives each partition its own reducer thread. Mappers are
+handed to the reducers as soon as they finish, and each reducer frees a
+mapper's partition once it has been merged, so only the partitions still
+waiting to be merged are held alongside the running result '''
+
+from concurrent.futures import as_completed
+
+def execute_keyed(workers, executor=None):
+    if executor is None:
+        with ThreadPoolExecutor() as executor:
+            return execute_keyed(workers, executor)
+
+    futures = [executor.submit(run_map, w) for w in workers]
+    first, queues, reducers, errors = None, [], [], []
+
+    def reduce_partition(index, queue):
+        while True:
+            worker = queue.get()
+            if worker is None:
+                break
+            if errors:
+                continue  # Keep draining so the sentinel is reached
+            try:
+                first.reduce_partition(index, worker)
+            except Exception as e:
+                errors.append(e)
+
+    try:
+        for future in as_completed(futures):
+            worker = future.result()
+            if first is None:
+                first = worker
+                for index in range(first.partitions):
+                    queue = Queue()
+                    queues.append(queue)
+                    reducers.append(Thread(target=reduce_partition,
+                                           args=(index, queue)))
+                for thread in reducers: thread.start()
+            else:
+                for queue in queues:
+                    queue.put(worker)
+    finally:
+        for future in futures:
+            future.cancel()
+        for queue in queues:
+            queue.put(None)
+        for thread in reducers: thread.join()
+    if errors:
+        raise errors[0]
+    if first is None:
+        raise ValueError('No inputs to map')
+
+    result = {}
+    for part in first.result:
+        result.update(part)
+    return result
+
+def mapreduce_keyed(worker_class, input_class, config, executor=None):
+    workers = worker_class.create_workers(input_class, config)
+    return execute_keyed(workers, executor=executor)
+
+
+# Example 31
+''' A word count only needs to say which pairs to emit '''
+print('\nExample 31:\n==========')
+
+class WordCountWorker(KeyedWorker):
+    def map_pairs(self):
+        for word in self.input_data.read().split():
+            yield word, 1
+
+def write_word_files(tmpdir):
+    words = ['red', 'green', 'blue', 'cyan', 'magenta', 'yellow']
+    for i in range(100):
+        with open(os.path.join(tmpdir, str(i)), 'w') as f:
+            for _ in range(random.randint(0, 100)):
+                f.write(random.choice(words) + '\n')
+
+with TemporaryDirectory() as tmpdir:
+    write_word_files(tmpdir)
+    config = {'data_dir': tmpdir}
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        counts = mapreduce_keyed(WordCountWorker, PathInputData, config,
+                                 executor=executor)
+    lines = mapreduce(LineCountWorker, PathInputData, config)
+print(sorted(counts.items()))
+print(sum(counts.values()), 'words in', lines, 'lines')
+
+
+# Example 32
+''' Rerunning the job over a directory where only a few files changed repeats
+all of the map work. Keep a persistent cache of map results keyed by worker
+class and input path, plus the byte range for splits, validated by size, mtime
+and optionally a content hash. Only new or changed inputs are mapped again, and
+files are only hashed when their size or mtime has changed. The cache is
+replaced atomically before reduce runs, because reduce() may modify the first
+worker's result in place '''
+
+import hashlib
+import pickle
+import tempfile
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        return {}  # A missing or unreadable cache just means a full run
+
+def save_cache(cache_path, cache):
+    # Write a temporary file and rename it so a crash never truncates the cache
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(cache_path)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(cache, f)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def cache_key(input_data):
+    # Byte-range splits share a path, so their range is part of the key
+    path = getattr(input_data, 'path', None)
+    if path is None:
+        raise ValueError('%s has no path to cache results by'
+                         % type(input_data).__name__)
+    return (path, getattr(input_data, 'start', None),
+            getattr(input_data, 'end', None))
+
+def mapreduce_cached(worker_class, input_class, config, executor=None):
+    cache_path = config['cache_path']
+    use_hash = config.get('cache_hash', False)
+    cache = load_cache(cache_path)
+
+    class_name = '%s.%s' % (worker_class.__module__, worker_class.__qualname__)
+    cached, stale, new_cache = [], [], {}
+    for worker in worker_class.create_workers(input_class, config):
+        key = (class_name,) + cache_key(worker.input_data)
+        path = key[1]
+        stat = os.stat(path)
+        entry = cache.get(key)
+        if (entry is not None and
+                entry[0][:2] == (stat.st_size, stat.st_mtime_ns)):
+            new_cache[key] = entry
+            worker.result = entry[1]
+            cached.append(worker)
+            continue
+        # Only hash files whose size or mtime changed
+        digest = file_digest(path) if use_hash else None
+        stamp = (stat.st_size, stat.st_mtime_ns, digest)
+        if (entry is not None and digest is not None and
+                entry[0][2] == digest):
+            new_cache[key] = (stamp, entry[1])
+            worker.result = entry[1]
+            cached.append(worker)
+        else:
+            stale.append((key, stamp, worker))
+
+    workers = [worker for _, _, worker in stale]
+    if executor is None:
+        threads = [Thread(target=w.map) for w in workers]
+        for thread in threads: thread.start()
+        for thread in threads: thread.join()
+    else:
+        workers = list(executor.map(run_map, workers))
+
+    for (key, stamp, _), worker in zip(stale, workers):
+        new_cache[key] = (stamp, worker.result)
+    save_cache(cache_path, new_cache)
+
+    workers = cached + workers
+    if not workers:
+        raise ValueError('No inputs to map')
+    first, rest = workers[0], workers[1:]
+    for worker in rest:
+        first.reduce(worker)
+    return first.result, len(stale)
+
+
+# Example 33
+''' The second run only maps the file that changed '''
+print('\nExample 33:\n==========')
+
+with TemporaryDirectory() as tmpdir, TemporaryDirectory() as cachedir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir,
+              'cache_path': os.path.join(cachedir, 'linecount.cache')}
+    result, mapped = mapreduce_cached(LineCountWorker, PathInputData, config)
+    print('There are', result, 'lines, mapped', mapped, 'inputs')
+    with open(os.path.join(tmpdir, '0'), 'a') as f:
+        f.write('\n' * 1000)
+    result, mapped = mapreduce_cached(LineCountWorker, PathInputData, config)
+    print('There are', result, 'lines, mapped', mapped, 'inputs')
+
+
+# Example 34
+''' Nothing measures how mapreduce scales. Generate reproducible synthetic
+corpora with a configurable file count, size distribution and line density '''
+
+def write_synthetic_files(tmpdir, file_count=100, mean_size=10000,
+                          distribution='uniform', line_density=0.02, seed=0):
+    rng = random.Random(seed)
+    sizes = {
+        'fixed': lambda: mean_size,
+        'uniform': lambda: rng.randint(0, 2 * mean_size),
+        'lognormal': lambda: int(rng.lognormvariate(
+            math.log(mean_size) - 0.5, 1.0)),
+    }[distribution]
+    total = 0
+    for i in range(file_count):
+        size = sizes()
+        with open(os.path.join(tmpdir, str(i)), 'w') as f:
+            written = 0
+            while written < size:
+                length = min(size - written,
+                             max(1, int(rng.expovariate(line_density))))
+                f.write('x' * (length - 1) + '\n')
+                written += length
+        total += size
+    return total
+
+
+# Example 35
+''' Time every map task inside the task itself so the latencies survive being
+sent back from a process pool. Run each execution strategy over the same
+corpus and report throughput, task latency percentiles, peak RSS and CPU
+utilisation as JSON. Each strategy runs in a forked process of its own, so the
+peak RSS it reports isn't inherited from the strategies before it '''
+
+import json
+import resource
+import time
+
+class TimedLineCountWorker(GenericWorker):
+    def map(self):
+        start = time.perf_counter()
+        data = self.input_data.read()
+        self.result = (data.count('\n'), [time.perf_counter() - start])
+
+    def reduce(self, other):
+        count, latencies = self.result
+        other_count, other_latencies = other.result
+        latencies.extend(other_latencies)
+        self.result = (count + other_count, latencies)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(fraction * len(ordered)))
+    return ordered[index]
+
+def cpu_seconds():
+    total = 0
+    for who in (resource.RUSAGE_SELF, resource.RUSAGE_CHILDREN):
+        usage = resource.getrusage(who)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+def run_strategy(strategy, config):
+    workers = TimedLineCountWorker.create_workers(PathInputData, config)
+    max_workers = config.get('max_workers', 8)
+    if strategy == 'threads':
+        return execute(workers)
+    if strategy == 'processes':
+        with ProcessPoolExecutor(max_workers,
+                                 mp_context=get_context('fork')) as executor:
+            return execute(workers, executor=executor)
+    if strategy == 'bounded':
+        return execute_bounded(workers, max_workers)
+    if strategy == 'tree':
+        with ThreadPoolExecutor(max_workers) as executor:
+            return execute_tree(workers, executor)
+    raise ValueError('Unknown strategy %r' % strategy)
+
+def measure_strategy(strategy, config, total_bytes, file_count):
+    cpu_start = cpu_seconds()
+    start = time.perf_counter()
+    lines, latencies = run_strategy(strategy, config)
+    wall = time.perf_counter() - start
+    cpu = cpu_seconds() - cpu_start
+    rss_kb = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return {
+        'strategy': strategy,
+        'lines': lines,
+        'seconds': wall,
+        'mb_per_second': total_bytes / wall / 1e6,
+        'files_per_second': file_count / wall,
+        'task_p50_seconds': percentile(latencies, 0.50),
+        'task_p99_seconds': percentile(latencies, 0.99),
+        'peak_rss_kb': rss_kb,
+        'cpu_utilisation': cpu / wall,
+    }
+
+def measure_in_child(conn, *args):
+    try:
+        conn.send(measure_strategy(*args))
+    except Exception as e:
+        conn.send(e)
+    finally:
+        conn.close()
+
+def benchmark(config, strategies=('threads', 'processes', 'bounded', 'tree')):
+    # ru_maxrss is a lifetime peak, so each strategy gets its own process
+    report = {'corpus': dict(config.get('corpus', {})), 'runs': []}
+    fork = get_context('fork')
+    with TemporaryDirectory() as tmpdir:
+        total_bytes = write_synthetic_files(tmpdir, **report['corpus'])
+        file_count = len(os.listdir(tmpdir))
+        run_config = dict(config, data_dir=tmpdir)
+        for strategy in strategies:
+            receiver, sender = fork.Pipe(duplex=False)
+            child = fork.Process(
+                target=measure_in_child,
+                args=(sender, strategy, run_config, total_bytes, file_count))
+            child.start()
+            sender.close()
+            try:
+                run = receiver.recv()
+            finally:
+                receiver.close()
+                child.join()
+            if isinstance(run, Exception):
+                raise run
+            report['runs'].append(run)
+    output = config.get('output')
+    if output:
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+# Example 36
+''' A small run prints the report. Point config['output'] at a file to keep
+results between versions '''
+print('\nExample 36:\n==========')
+
+if __name__ == '__main__':
+    config = {'max_workers': 4,
+              'corpus': {'file_count': 50, 'mean_size': 5000,
+                         'distribution': 'lognormal'}}
+    report = benchmark(config)
+    for run in report['runs']:
+        print('%(strategy)-10s %(lines)6d lines '
+              '%(files_per_second)9.0f files/s' % run)
+    print(json.dumps(report['runs'][0], indent=2, sort_keys=True))
+
+
+# Example 37
+''' I/O-bound inputs such as network filesystems and sockets spend their time
+waiting, which asyncio handles with far less overhead than a thread per input.
+Async inputs and workers define read() and map() as coroutines. A semaphore
+caps how many are in flight, and plain synchronous workers still run, falling
+back to the default thread executor '''
+
+import asyncio
+
+class AsyncPathInputData(PathInputData):
+    async def read(self):
+        # Files have no async API, so hand the blocking read to a thread
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, super().read)
+
+class AsyncLineCountWorker(GenericWorker):
+    async def map(self):
+        data = await self.input_data.read()
+        self.result = data.count('\n')
+
+    def reduce(self, other):
+        self.result += other.result
+
+async def execute_async(workers, concurrency=100):
+    semaphore = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+
+    async def run(worker):
+        async with semaphore:
+            if asyncio.iscoroutinefunction(worker.map):
+                await worker.map()
+            else:
+                await loop.run_in_executor(None, worker.map)
+        return worker
+
+    workers = await asyncio.gather(*(run(w) for w in workers))
+    if not workers:
+        raise ValueError('No inputs to map')
+    first, rest = workers[0], workers[1:]
+    for worker in rest:
+        first.reduce(worker)
+    return first.result
+
+def mapreduce_async(worker_class, input_class, config):
+    workers = worker_class.create_workers(input_class, config)
+    concurrency = config.get('concurrency', 100)
+    return asyncio.run(execute_async(workers, concurrency))
+
+
+# Example 38
+''' Async and sync workers give the same answer '''
+print('\nExample 38:\n==========')
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir, 'concurrency': 10}
+    result = mapreduce_async(AsyncLineCountWorker, AsyncPathInputData, config)
+    expected = mapreduce_async(LineCountWorker, PathInputData, config)
+print('There are', result, 'lines, expected', expected)
+
+
+# Example 39
+''' Inputs created from the scan carry their size and mtime along '''
+print('\nExample 39:\n==========')
+
+class ScannedPathInputData(PathInputData):
+    def __init__(self, path, size=None, mtime=None):
+        super().__init__(path)
+        self.size = size
+        self.mtime = mtime
+
+    @classmethod
+    def generate_inputs(cls, config):
+        for entry in scan_inputs(config):
+            yield cls(entry.path, entry.size, entry.mtime)
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    nested = os.path.join(tmpdir, 'nested')
+    os.mkdir(nested)
+    write_test_files(nested)
+    config = {'data_dir': tmpdir, 'recursive': True, 'exclude': ['*5']}
+    inputs = list(ScannedPathInputData.generate_inputs(config))
+    total_size = sum(input_data.size for input_data in inputs)
+    result = mapreduce(LineCountWorker, ScannedPathInputData, config)
+print(len(inputs), 'files of', total_size, 'bytes')
+print('There are', result, 'lines')
+
+
+# Example 40
+''' create_workers drains the inputs into a list, and every worker and its
+result stays alive until the end of the job. Create workers lazily instead,
+only submit a new one when fewer than max_in_flight are running, and fold each
+finished worker into the running result so it can be freed straight away '''
+
+def stream_workers(worker_class, input_class, config):
+    for input_data in input_class.generate_inputs(config):
+        yield worker_class(input_data)
+
+def execute_streaming(workers, executor, max_in_flight=16):
+    workers = iter(workers)
+    pending = set()
+    total = None
+    while True:
+        for worker in workers:
+            pending.add(executor.submit(run_map, worker))
+            if len(pending) >= max_in_flight:
+                break
+        if not pending:
+            break
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            worker = future.result()
+            if total is None:
+                total = worker
+            else:
+                total.reduce(worker)
+    if total is None:
+        raise ValueError('No inputs to map')
+    return total.result
+
+def mapreduce_streaming(worker_class, input_class, config, executor):
+    workers = stream_workers(worker_class, input_class, config)
+    return execute_streaming(workers, executor,
+                             config.get('max_in_flight', 16))
+
+
+# Example 41
+''' Only max_in_flight workers exist at once, however many files there are '''
+print('\nExample 41:\n==========')
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir, 'max_in_flight': 8}
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result = mapreduce_streaming(LineCountWorker, ScannedPathInputData,
+                                     config, executor)
+print('There are', result, 'lines')
+
+
+# Example 42
+''' A slow run gives no hint of whether the time goes to read(), map() or
+reduce(), or to a few straggler inputs. Wrap each input so its reads are timed
+and measured, whether through read(), read_chunks() or mmap(), and record
+per-task timings, bytes read, result size and the time spent waiting in the
+executor queue. Metrics are passed to a hook object, and without one the plain
+streaming path runs with no extra cost '''
+
+import sys
+
+TaskMetrics = collections.namedtuple(
+    'TaskMetrics', ('name', 'queue_wait', 'read_time', 'map_time',
+                    'bytes_read', 'result_size'))
+
+def stored_size(input_data):
+    # Bytes on disk behind a read(), which the decoded text can't tell us
+    if hasattr(input_data, 'start') and hasattr(input_data, 'end'):
+        return input_data.end - input_data.start
+    paths = getattr(input_data, 'paths', None)
+    if paths is None and hasattr(input_data, 'path'):
+        paths = [input_data.path]
+    if paths is None:
+        return None
+    return sum(os.stat(path).st_size for path in paths)
+
+class MeteredInputData(object):
+    def __init__(self, input_data):
+        self.input_data = input_data
+        self.read_time = 0
+        self.bytes_read = 0
+
+    def read(self):
+        start = time.perf_counter()
+        data = self.input_data.read()
+        self.read_time += time.perf_counter() - start
+        if isinstance(data, (bytes, bytearray)):
+            self.bytes_read += len(data)
+        else:
+            self.bytes_read += stored_size(self.input_data) or 0
+        return data
+
+    def read_chunks(self, *args, **kwargs):
+        chunks = self.input_data.read_chunks(*args, **kwargs)
+        while True:
+            start = time.perf_counter()
+            chunk = next(chunks, None)
+            self.read_time += time.perf_counter() - start
+            if chunk is None:
+                return
+            self.bytes_read += len(chunk)
+            yield chunk
+
+    @contextmanager
+    def mmap(self):
+        # Page faults while scanning the map still count as map time
+        start = time.perf_counter()
+        with self.input_data.mmap() as m:
+            self.read_time += time.perf_counter() - start
+            self.bytes_read += len(m)
+            yield m
+
+    def __getattr__(self, name):
+        return getattr(self.input_data, name)
+
+def run_metered_map(worker, submitted):
+    started = time.perf_counter()
+    metered = MeteredInputData(worker.input_data)
+    worker.input_data = metered
+    worker.map()
+    elapsed = time.perf_counter() - started
+    worker.input_data = metered.input_data
+    metrics = TaskMetrics(
+        name=getattr(metered.input_data, 'path', repr(metered.input_data)),
+        queue_wait=started - submitted,
+        read_time=metered.read_time,
+        map_time=elapsed - metered.read_time,
+        bytes_read=metered.bytes_read,
+        result_size=sys.getsizeof(worker.result))
+    return worker, metrics
+
+def execute_instrumented(workers, executor, hooks=None, max_in_flight=16):
+    if hooks is None:
+        return execute_streaming(workers, executor, max_in_flight)
+
+    workers = iter(workers)
+    pending = set()
+    total = None
+    while True:
+        for worker in workers:
+            pending.add(executor.submit(
+                run_metered_map, worker, time.perf_counter()))
+            if len(pending) >= max_in_flight:
+                break
+        if not pending:
+            break
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            worker, metrics = future.result()
+            hooks.task(metrics)
+            if total is None:
+                total = worker
+            else:
+                start = time.perf_counter()
+                total.reduce(worker)
+                hooks.reduce(time.perf_counter() - start)
+    if total is None:
+        raise ValueError('No inputs to map')
+    return total.result
+
+
+# Example 43
+''' The report collects every callback and summarises where the time went,
+including the slowest tasks '''
+print('\nExample 43:\n==========')
+
+class MetricsReport(object):
+    def __init__(self):
+        self.tasks = []
+        self.reduce_time = 0
+
+    def task(self, metrics):
+        self.tasks.append(metrics)
+
+    def reduce(self, seconds):
+        self.reduce_time += seconds
+
+    def summary(self, slowest=3):
+        lines = [
+            '%d tasks, %d bytes read' % (
+                len(self.tasks), sum(t.bytes_read for t in self.tasks)),
+            'queue wait %.6fs, read %.6fs, map %.6fs, reduce %.6fs' % (
+                sum(t.queue_wait for t in self.tasks),
+                sum(t.read_time for t in self.tasks),
+                sum(t.map_time for t in self.tasks),
+                self.reduce_time),
+        ]
+        ranked = sorted(self.tasks, key=lambda t: t.read_time + t.map_time,
+                        reverse=True)
+        for t in ranked[:slowest]:
+            lines.append('slow: %s %.6fs' % (
+                os.path.basename(t.name), t.read_time + t.map_time))
+        return '\n'.join(lines)
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir}
+    report = MetricsReport()
+    workers = stream_workers(LineCountWorker, PathInputData, config)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result = execute_instrumented(workers, executor, hooks=report)
+print('There are', result, 'lines')
+print(report.summary())
+
+
+# Example 44
+''' Large map results are pickled and copied back from worker processes. Put
+them in shared memory instead, so only a small handle crosses the process
+boundary and reduce() adds the other result into its own buffer in place.
+Blocks are created by the workers as they map. mapreduce_shared() starts the
+resource tracker before the pool forks, so every child process registers its
+blocks with the parent's tracker and they outlive the pool's processes '''
+
+from array import array
+from multiprocessing import resource_tracker, shared_memory
+
+class SharedArray(object):
+    def __init__(self, length, typecode='q'):
+        size = length * array(typecode).itemsize
+        shm = shared_memory.SharedMemory(create=True, size=size)
+        self.name = shm.name
+        self.length = length
+        self.typecode = typecode
+        shm.close()
+
+    @contextmanager
+    def view(self):
+        shm = shared_memory.SharedMemory(name=self.name)
+        try:
+            with shm.buf[:self.length * array(self.typecode).itemsize] \
+                    .cast(self.typecode) as values:
+                yield values
+        finally:
+            shm.close()
+
+    def tolist(self):
+        with self.view() as values:
+            return values.tolist()
+
+    def unlink(self):
+        try:
+            shm = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return  # Already released
+        shm.close()
+        shm.unlink()
+
+
+# Example 45
+''' A byte histogram keeps the usual GenericWorker contract. The block is only
+allocated once map() runs, and a failed map() releases its own block. The run
+collects every mapped worker so a try/finally can release any block that
+reduce() didn't, even when a task fails '''
+print('\nExample 45:\n==========')
+
+class ByteHistogramWorker(GenericWorker):
+    def map(self):
+        counts = collections.Counter()
+        for chunk in self.input_data.read_chunks():
+            counts.update(chunk)
+        self.result = SharedArray(256)
+        try:
+            with self.result.view() as values:
+                for byte, count in counts.items():
+                    values[byte] = count
+        except BaseException:
+            self.result.unlink()
+            raise
+
+    def reduce(self, other):
+        with self.result.view() as values, other.result.view() as theirs:
+            for i in range(len(values)):
+                values[i] += theirs[i]
+        other.result.unlink()
+
+def mapreduce_shared(worker_class, input_class, config, executor):
+    workers = worker_class.create_workers(input_class, config)
+    # The pool forks its processes on the first submit
+    resource_tracker.ensure_running()
+    futures = [executor.submit(run_map, w) for w in workers]
+    try:
+        mapped = [future.result() for future in futures]
+        first, rest = mapped[0], mapped[1:]
+        for worker in rest:
+            first.reduce(worker)
+        return first.result.tolist()
+    finally:
+        wait(futures)
+        for future in futures:
+            if future.exception() is None:
+                future.result().result.unlink()
+
+if __name__ == '__main__':
+    with TemporaryDirectory() as tmpdir:
+        write_test_files(tmpdir)
+        config = {'data_dir': tmpdir}
+        with ProcessPoolExecutor(
+                max_workers=4, mp_context=get_context('fork')) as executor:
+            histogram = mapreduce_shared(ByteHistogramWorker, PathInputData,
+                                         config, executor)
+        expected = mapreduce(LineCountWorker, PathInputData, config)
+    print('There are', histogram[ord('\n')], 'newlines, expected', expected)
+
+
+# Example 46
+''' To spread one job across several hosts, a coordinator hands out inputs
+over a socket and agents run map() and send each partial result straight back.
+multiprocessing.connection already provides authenticated, pickled message
+framing. Worker and input classes travel by reference, so agents must be able
+to import them. Results are unpickled, so the authkey must be a shared secret.
+If an agent disconnects, its task goes back on the queue, and the other agents
+keep waiting until every task handed out has been answered. Agents that don't
+connect within the timeout are left out '''
+
+import socket
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from threading import Condition
+
+def run_agent(address, authkey):
+    with Client(address, authkey=authkey) as conn:
+        while True:
+            task = conn.recv()
+            if task is None:
+                break
+            worker_class, input_data = task
+            worker = worker_class(input_data)
+            worker.map()
+            conn.send(worker.result)
+
+class Coordinator(object):
+    def __init__(self, worker_class, input_class, config, authkey,
+                 address=('localhost', 0)):
+        self.worker_class = worker_class
+        self.inputs = input_class.generate_inputs(config)
+        self.retry = []
+        self.outstanding = 0
+        self.total = None
+        self.ready = Condition()
+        self.accepting = True
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+
+    def next_input(self):
+        # Wait while other agents still hold tasks that may come back
+        with self.ready:
+            while True:
+                if self.retry:
+                    input_data = self.retry.pop()
+                else:
+                    input_data = next(self.inputs, None)
+                if input_data is not None:
+                    self.outstanding += 1
+                    return input_data
+                if not self.outstanding:
+                    return None
+                self.ready.wait()
+
+    def finish(self, input_data, result=None, failed=False):
+        with self.ready:
+            self.outstanding -= 1
+            if failed:
+                self.retry.append(input_data)
+            else:
+                worker = self.worker_class(input_data)
+                worker.result = result
+                if self.total is None:
+                    self.total = worker
+                else:
+                    self.total.reduce(worker)
+            self.ready.notify_all()
+
+    def serve(self, conn):
+        with conn:
+            while True:
+                input_data = self.next_input()
+                if input_data is None:
+                    try:
+                        conn.send(None)
+                    except OSError:
+                        pass
+                    break
+                try:
+                    conn.send((self.worker_class, input_data))
+                    result = conn.recv()
+                except (EOFError, OSError):
+                    self.finish(input_data, failed=True)
+                    break
+                self.finish(input_data, result)
+
+    def accept_agents(self, agent_count, threads):
+        while self.accepting and len(threads) < agent_count:
+            try:
+                conn = self.listener.accept()
+            except (EOFError, OSError, AuthenticationError):
+                continue  # A failed handshake, or the wake-up below
+            thread = Thread(target=self.serve, args=(conn,))
+            thread.start()
+            threads.append(thread)
+
+    def run(self, agent_count, timeout=30):
+        threads = []
+        with self.listener:
+            acceptor = Thread(target=self.accept_agents,
+                              args=(agent_count, threads))
+            acceptor.start()
+            acceptor.join(timeout)
+            if acceptor.is_alive():
+                # Carry on with the agents that connected in time
+                self.accepting = False
+                socket.create_connection(self.address).close()
+                acceptor.join()
+        if not threads:
+            raise RuntimeError('No agents connected within %ss' % timeout)
+        for thread in threads: thread.join()
+        if self.retry:
+            raise RuntimeError('%d inputs lost with their agents'
+                               % len(self.retry))
+        return self.total.result
+
+
+# Example 47
+''' Several agent processes on localhost stand in for remote hosts '''
+print('\nExample 47:\n==========')
+
+if __name__ == '__main__':
+    with TemporaryDirectory() as tmpdir:
+        write_test_files(tmpdir)
+        config = {'data_dir': tmpdir}
+        authkey = os.urandom(16)
+        coordinator = Coordinator(LineCountWorker, PathInputData, config,
+                                  authkey=authkey)
+        fork = get_context('fork')
+        agents = [fork.Process(target=run_agent,
+                               args=(coordinator.address, authkey))
+                  for _ in range(3)]
+        for agent in agents: agent.start()
+        result = coordinator.run(len(agents))
+        for agent in agents: agent.join()
+        expected = mapreduce(LineCountWorker, PathInputData, config)
+    print('There are', result, 'lines, expected', expected)
+
+
+# Example 48
+''' Each mapper blocks on its own read, so disk and CPU never overlap. Read the
+next few inputs ahead on a background thread into a bounded queue, hinting the
+kernel with posix_fadvise about files that will be read soon. Mappers then get
+inputs whose data is already in memory. Other attributes such as path are
+forwarded to the original input, and the reader stops as soon as the consumer
+does '''
+
+from queue import Full
+from threading import Event
+
+class PrefetchedInputData(GenericInputData):
+    def __init__(self, input_data, data):
+        super().__init__()
+        self.input_data = input_data
+        self.data = data
+
+    def read(self):
+        return self.data
+
+    def __getattr__(self, name):
+        if name == 'input_data':
+            raise AttributeError(name)  # Not set yet while unpickling
+        return getattr(self.input_data, name)
+
+def advise_willneed(path):
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+def prefetch_inputs(inputs, depth=4):
+    buffer = Queue(maxsize=depth)
+    stop = Event()
+    done = object()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except Full:
+                pass
+        return False
+
+    def load(input_data):
+        return put(PrefetchedInputData(input_data, input_data.read()))
+
+    def read_ahead():
+        # Hint the kernel about the next few files before reading this one
+        window = collections.deque()
+        try:
+            for input_data in inputs:
+                path = getattr(input_data, 'path', None)
+                if path is not None:
+                    advise_willneed(path)
+                window.append(input_data)
+                if len(window) >= depth and not load(window.popleft()):
+                    return
+            while window:
+                if not load(window.popleft()):
+                    return
+        except Exception as e:
+            put(e)
+        put(done)
+
+    reader = Thread(target=read_ahead, daemon=True)
+    reader.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        reader.join()
+
+
+# Example 49
+''' The prefetched inputs feed the streaming executor like any other input '''
+print('\nExample 49:\n==========')
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir}
+    inputs = prefetch_inputs(PathInputData.generate_inputs(config), depth=8)
+    workers = (LineCountWorker(input_data) for input_data in inputs)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        result = execute_streaming(workers, executor)
+print('There are', result, 'lines')
+
+
+# Example 50
+''' A keyed reduce that keeps a dict per worker runs out of memory on
+high-cardinality keys. Once more than max_keys keys are held, write them out as
+a sorted run to a file in a spill directory and start again. Runs are kept by
+name and only opened while they are merged, so many live counters don't hold
+open files, and too many runs are compacted into one. Reading the results
+merges the runs with a k-way streaming merge, adding up values for equal keys,
+so only one pair per run is in memory at a time '''
+
+from itertools import groupby
+from operator import itemgetter
+
+class SpillingCounter(object):
+    def __init__(self, max_keys=100000, max_runs=16, spill_dir=None):
+        self.max_keys = max_keys
+        self.max_runs = max_runs
+        self.spill_dir = spill_dir
+        self.memory = {}
+        self.runs = []
+
+    def add(self, key, value):
+        self.memory[key] = self.memory.get(key, 0) + value
+        if len(self.memory) > self.max_keys:
+            self.spill()
+
+    def _write_run(self, items):
+        fd, path = tempfile.mkstemp(suffix='.run', dir=self.spill_dir)
+        with os.fdopen(fd, 'wb') as f:
+            for item in items:
+                pickle.dump(item, f)
+        return path
+
+    def spill(self):
+        self.runs.append(self._write_run(sorted(self.memory.items())))
+        self.memory.clear()
+        if len(self.runs) > self.max_runs:
+            self.compact()
+
+    def compact(self):
+        # Merge every run into one to bound how many are opened at once
+        path = self._write_run(self.items())
+        for old in self.runs:
+            os.unlink(old)
+        self.runs = [path]
+
+    @staticmethod
+    def _read_run(path):
+        with open(path, 'rb') as f:
+            while True:
+                try:
+                    yield pickle.load(f)
+                except EOFError:
+                    return
+
+    def items(self):
+        streams = [self._read_run(path) for path in self.runs]
+        streams.append(iter(sorted(self.memory.items())))
+        merged = heapq.merge(*streams, key=itemgetter(0))
+        for key, group in groupby(merged, key=itemgetter(0)):
+            yield key, sum(value for _, value in group)
+
+    def close(self):
+        for path in self.runs:
+            os.unlink(path)
+        self.runs = []
+        self.memory.clear()
+
+
+# Example 51
+''' Reducing streams the other worker's merged pairs into this one, which
+spills again whenever it passes the budget '''
+print('\nExample 51:\n==========')
+
+class SpillingWordCountWorker(GenericWorker):
+    max_keys = 100000
+    max_runs = 16
+    spill_dir = None
+
+    def map(self):
+        self.result = SpillingCounter(self.max_keys, self.max_runs,
+                                      self.spill_dir)
+        for word in self.input_data.read().split():
+            self.result.add(word, 1)
+
+    def reduce(self, other):
+        for key, value in other.result.items():
+            self.result.add(key, value)
+        other.result.close()
+
+class TinyBudgetWordCountWorker(SpillingWordCountWorker):
+    max_keys = 20
+
+def write_id_files(tmpdir):
+    for i in range(100):
+        with open(os.path.join(tmpdir, str(i)), 'w') as f:
+            for _ in range(random.randint(0, 100)):
+                f.write('id%d\n' % random.randint(0, 500))
+
+with TemporaryDirectory() as tmpdir, TemporaryDirectory() as spilldir:
+    write_id_files(tmpdir)
+    config = {'data_dir': tmpdir}
+    TinyBudgetWordCountWorker.spill_dir = spilldir
+    counter = mapreduce(TinyBudgetWordCountWorker, PathInputData, config)
+    spilled = dict(counter.items())
+    runs = len(counter.runs)
+    counter.close()
+    leftover = len(os.listdir(spilldir))
+    expected = mapreduce_keyed(WordCountWorker, PathInputData, config)
+print(len(spilled), 'keys from', runs, 'runs, matches:', spilled == expected)
+print(leftover, 'runs left on disk')
+
+
+# Example 52
+''' Counting lines only needs the newline byte, so decoding to str is wasted
+work. Count a single byte directly on the raw data instead. Without NumPy,
+read into one reused buffer and call bytearray.count, which runs at close to
+memory speed. With NumPy, compare slices of a memory map against the byte.
+Any encoding where the newline is a single byte gives the same answer '''
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+def count_byte(path, byte=b'\n', chunk_size=16 * 1024 * 1024):
+    if len(byte) != 1:
+        raise ValueError('Expected a single byte, got %r' % byte)
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return 0
+        if numpy is not None:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                data = numpy.frombuffer(m, dtype=numpy.uint8)
+                total = 0
+                for start in range(0, size, chunk_size):
+                    chunk = data[start:start + chunk_size]
+                    total += int(numpy.count_nonzero(chunk == byte[0]))
+                del data, chunk  # Release the exported buffer before closing
+                return total
+        buffer = bytearray(min(chunk_size, size))
+        total = 0
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            if n == len(buffer):
+                total += buffer.count(byte)
+            else:
+                total += buffer[:n].count(byte)
+        return total
+
+
+# Example 53
+''' The worker only needs the path from its input '''
+print('\nExample 53:\n==========')
+
+class FastLineCountWorker(GenericWorker):
+    def map(self):
+        self.result = count_byte(self.input_data.path)
+
+    def reduce(self, other):
+        self.result += other.result
+
+with TemporaryDirectory() as tmpdir:
+    write_test_files(tmpdir)
+    config = {'data_dir': tmpdir}
+    result = mapreduce(FastLineCountWorker, PathInputData, config)
+    expected = mapreduce(LineCountWorker, PathInputData, config)
+print('There are', result, 'lines, expected', expected)